@@ -0,0 +1,204 @@
+"""Regression tests for the regex redaction pipeline.
+
+main.py loads the GLiNER model at import time, so the heavy dependencies are
+stubbed out before importing it. These tests exercise the pure
+regex -> merge -> filter -> redact path, which since the removal of the
+enforce_final_redaction second pass is the only thing standing between a
+pattern-matchable PII string and the response.
+"""
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _stub(name, **attrs):
+    mod = types.ModuleType(name)
+    for key, value in attrs.items():
+        setattr(mod, key, value)
+    sys.modules[name] = mod
+
+
+def _install_stubs():
+    os.environ["CACHE_DB"] = os.path.join(tempfile.mkdtemp(), "cache.db")
+    os.environ["MODEL_CACHE"] = tempfile.mkdtemp()
+
+    class _App:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def _decorator(self, *args, **kwargs):
+            return lambda f: f
+
+        api_route = post = get = on_event = _decorator
+
+    class _Model:
+        config = types.SimpleNamespace(max_len=512)
+
+        def predict_entities(self, text, labels=None, **kwargs):
+            return []
+
+        def batch_predict_entities(self, texts, labels=None, **kwargs):
+            return [[] for _ in texts]
+
+    _stub("fastapi", FastAPI=_App)
+    _stub("fastapi.responses", ORJSONResponse=object)
+    _stub("pydantic", BaseModel=object)
+    _stub("torch",
+          compile=lambda m, **k: m,
+          inference_mode=lambda: __import__("contextlib").nullcontext(),
+          set_num_threads=lambda n: None,
+          set_num_interop_threads=lambda n: None)
+    _stub("gliner", GLiNER=types.SimpleNamespace(from_pretrained=lambda *a, **k: _Model()))
+    _stub("huggingface_hub", snapshot_download=lambda *a, **k: tempfile.mkdtemp())
+
+
+def _fake_hyperscan():
+    """Just enough of the hyperscan API for main's scan path: compiles the
+    expressions with stdlib re (rejecting lookbehind, which real Hyperscan
+    cannot compile either) and reports byte-offset (id, start, end) for every
+    position where a pattern matches — the overlapping all-matches shape the
+    reconstruction in _hyperscan_fallback expects."""
+    import re as stdlib_re
+
+    hs = types.ModuleType("hyperscan")
+    hs.HS_FLAG_SOM_LEFTMOST = 1
+    hs.HS_FLAG_CASELESS = 2
+
+    class Database:
+        def compile(self, expressions, ids, flags):
+            self._patterns = []
+            for expr, pat_id, flag in zip(expressions, ids, flags):
+                pattern = expr.decode()
+                if "(?<" in pattern:
+                    raise ValueError("lookbehind not supported")
+                re_flags = stdlib_re.IGNORECASE if flag & hs.HS_FLAG_CASELESS else 0
+                self._patterns.append((pat_id, stdlib_re.compile(pattern, re_flags)))
+
+        def scan(self, data, match_event_handler, context=None):
+            text = data.decode()
+            for pat_id, pat in self._patterns:
+                for pos in range(len(text) + 1):
+                    m = pat.match(text, pos)
+                    if m is not None and m.end() > m.start():
+                        match_event_handler(pat_id, m.start(), m.end(), 0, context)
+
+    hs.Database = Database
+    return hs
+
+
+def _import_main():
+    sys.modules.pop("main", None)
+    sys.path.insert(0, REPO_ROOT)
+    try:
+        import main as main_module
+        return main_module
+    finally:
+        sys.path.remove(REPO_ROOT)
+
+
+@pytest.fixture(scope="module")
+def main():
+    _install_stubs()
+    sys.modules.pop("hyperscan", None)  # force the re path
+    main_module = _import_main()
+    yield main_module
+    sys.modules.pop("main", None)
+
+
+@pytest.fixture()
+def main_hs():
+    _install_stubs()
+    sys.modules["hyperscan"] = _fake_hyperscan()
+    main_module = _import_main()
+    yield main_module
+    sys.modules.pop("hyperscan", None)
+    sys.modules.pop("main", None)
+
+
+def _redact(main, text):
+    """The regex half of the /redact pipeline (model returns nothing)."""
+    ents = main.merge_entities(main.regex_fallback(text))
+    ents = main.normalize_labels(ents)
+    ents = main.filter_entities(ents)
+    return main.redact_text(text, ents)
+
+
+ADVERSARIAL = [
+    "Contact john.doe+spam@mail.example.co.uk about the invoice",
+    "Call +1 (415) 555-0173 or 415-555-0173 right away",
+    "SSN 123-45-6789 was used for card 4111 1111 1111 1111",
+    "Meeting on 12/05/2024, patient DOB January 5, 1990",
+    "Fax 020 7946 0958 then email root@localhost.localdomain",
+    "123-456-789-012-345-678",
+    "Card: 4111-1111-1111-1111 exp 01/02/03, backup 5500 0000 0000 0004",
+    "My zip is 90210",
+    "Ship to Springfield IL 62704 before Friday",
+    "DOB 1-23-456 noted",
+    "Shipment 1-23-45 logged",
+]
+
+SWEEP_LABELS = ("EMAIL", "PHONE", "SSN", "CREDIT_CARD", "DATE", "ZIP_CODE")
+
+
+def test_no_pii_pattern_matches_redacted_output(main):
+    for text in ADVERSARIAL:
+        redacted = _redact(main, text)
+        for label in SWEEP_LABELS:
+            assert not main.REGEX_PATTERNS[label].search(redacted), (
+                f"{label} leaked through: {redacted!r}"
+            )
+
+
+def test_ssn_and_credit_card_outrank_phone(main):
+    redacted = _redact(main, "Reach me at 123-45-6789")
+    assert "[SSN]" in redacted and "[PHONE]" not in redacted
+    redacted = _redact(main, "Pay with 4111 1111 1111 1111")
+    assert "[CREDIT_CARD]" in redacted and "[PHONE]" not in redacted
+
+
+def test_bare_zip_is_redacted_despite_phone_priority(main):
+    # PHONE wins the alternation at a ZIP's start position but is rejected
+    # by the digit-count guard; the span must still come out as a ZIP.
+    assert _redact(main, "My zip is 90210") == "My zip is [ZIP_CODE]"
+
+
+def test_short_date_is_redacted_despite_phone_priority(main):
+    # Same consumed-span problem as the ZIP case, but for d-dd-ddd dates.
+    assert _redact(main, "DOB 1-23-456 noted") == "DOB [DATE] noted"
+
+
+def test_redact_text_preserves_surrounding_text(main):
+    text = "Email a@b.io or c@d.io today"
+    redacted = _redact(main, text)
+    assert redacted == "Email [EMAIL] or [EMAIL] today"
+
+
+def test_regex_entities_win_merge_ties_over_model_entities(main):
+    text = "SSN 123-45-6789"
+    regex_ents = main.regex_fallback(text)
+    model_ents = [{"start": 4, "end": 15, "text": "123-45-6789",
+                   "label": "phone number", "score": 0.5}]
+    merged = main.merge_entities(
+        main.concat_entities(regex_ents, main.entities_from_dicts(model_ents))
+    )
+    assert main.entities_to_dicts(merged)[0]["label"] == "SSN"
+
+
+def test_hyperscan_path_matches_re_path(main_hs):
+    assert main_hs.HS_DB is not None
+    # The ZIP lookbehind cannot compile; it must stay on the re path.
+    assert "ZIP_CODE" in main_hs._HS_UNSUPPORTED
+    for text in ADVERSARIAL:
+        hs_ents = main_hs.entities_to_dicts(main_hs.regex_fallback(text))
+        saved = main_hs.HS_DB
+        main_hs.HS_DB = None  # force the COMBINED path for the reference run
+        try:
+            re_ents = main_hs.entities_to_dicts(main_hs.regex_fallback(text))
+        finally:
+            main_hs.HS_DB = saved
+        assert hs_ents == re_ents, text